@@ -1,16 +1,198 @@
 """SVG icon generation API routes."""
 
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Query, Request
 from fastapi.responses import Response
-from app.models.icon import IconGenerationRequest, IconGenerationResponse
+from app.models.icon import IconGenerationRequest, IconGenerationResponse, SpriteRequest
+import asyncio
 import logging
-from typing import Optional
+import math
+from typing import Awaitable, List, Optional, Tuple, TypeVar
+from app.services.cancellation import (
+    CLIENT_DISCONNECTED,
+    RequestCancelled,
+    cancellation_stats,
+    request_deadline,
+    run_cancellable,
+)
+from app.services.icon_store import IconStore, icon_store
+from app.services.model_router import ModelRouter
+from app.services.scheduler import AdmissionRejected, scheduler, tenant_id
 from app.services.svg_generator import svg_generator
+from app.services.svg_sprite_builder import SVGSpriteBuilder
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1", tags=["svg-generation"])
 
+T = TypeVar("T")
+
+# Non-standard status (nginx convention) for requests the client abandoned.
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+
+def _deadline(x_request_timeout: Optional[str]) -> float:
+    """Deadline from the X-Request-Timeout header (seconds) or the default."""
+    if x_request_timeout is None:
+        return request_deadline()
+
+    try:
+        timeout = float(x_request_timeout)
+    except ValueError:
+        timeout = 0
+    if not timeout > 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="X-Request-Timeout must be a positive number of seconds.",
+        )
+
+    return request_deadline(timeout)
+
+
+def _deadline_exceeded(e: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail={"error": type(e).__name__, "message": str(e)},
+    )
+
+
+async def _run_cancellable(
+    work: Awaitable[T], http_request: Request, deadline: float
+) -> T:
+    """Run work, cancelling it on client disconnect or deadline expiry."""
+    try:
+        return await run_cancellable(work, http_request, deadline)
+    except RequestCancelled as e:
+        raise HTTPException(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST
+            if e.reason == CLIENT_DISCONNECTED
+            else status.HTTP_504_GATEWAY_TIMEOUT,
+            detail={"error": type(e).__name__, "message": str(e)},
+        )
+    except TimeoutError as e:
+        # The provider call timed out on the deadline just before we did.
+        raise _deadline_exceeded(e)
+
+
+def _check_auto_allowed(provider: Optional[str], api_key: str) -> None:
+    """Refuse provider="auto" unless the tenant may spend server credentials."""
+    if provider == "auto" and not ModelRouter.allows(tenant_id(api_key)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "error": "Forbidden",
+                "message": 'provider "auto" is not enabled for this API key',
+            },
+        )
+
+
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={"error": type(e).__name__, "message": str(e)},
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+async def _generate_scheduled(
+    request: IconGenerationRequest,
+    api_key: str,
+    deadline: float,
+    charge: bool = True,
+) -> Tuple[str, str, str]:
+    """Run generation in a scheduler slot for the caller's tenant."""
+    try:
+        async with scheduler.slot(tenant_id(api_key), request.priority, charge):
+            return await svg_generator.generate_icon(
+                description=request.prompt,
+                provider=request.provider,
+                model=request.model,
+                api_key=api_key,
+                deadline=deadline,
+            )
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    except TimeoutError as e:
+        raise _deadline_exceeded(e)
+
+
+def _store_icon(request: IconGenerationRequest, svg_code: str) -> Optional[str]:
+    """Store a generated icon for sprite use; returns None for unusable output."""
+    if SVGSpriteBuilder.parse_icon(svg_code) is None:
+        return None
+
+    return icon_store.put(
+        svg_code, IconStore.prompt_key(request.prompt, request.provider, request.model)
+    )
+
+
+def _reserve_batch(api_key: str, count: int) -> None:
+    """Admit a batch of generations at once, before any of them starts."""
+    if count > scheduler.tenant_burst:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": "ValidationError",
+                "message": f"A sprite can generate at most {scheduler.tenant_burst} "
+                f"new icons per request, got {count}",
+            },
+        )
+
+    try:
+        scheduler.reserve(tenant_id(api_key), count)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
+
+async def _generate_sprite_icon(
+    request: SpriteRequest, prompt: str, api_key: str, deadline: float
+) -> Optional[str]:
+    """Generate and store one sprite icon; rate limit tokens are reserved."""
+    icon_request = IconGenerationRequest(
+        prompt=prompt,
+        provider=request.provider,
+        model=request.model,
+        priority=request.priority,
+    )
+    svg_code, _, _ = await _generate_scheduled(
+        icon_request, api_key, deadline, charge=False
+    )
+    return _store_icon(icon_request, svg_code)
+
+
+def _sprite_response(
+    icon_ids: List[str], if_none_match: Optional[str], headers: dict = None
+) -> Response:
+    """Serve the sprite for a set of stored icons, cached by their sorted ids."""
+    sprite_key = IconStore.sprite_key(icon_ids)
+    headers = {
+        **(headers or {}),
+        "ETag": f'"{sprite_key}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    sprite = icon_store.get_sprite(sprite_key)
+    if sprite is None:
+        icons = {icon_id: icon_store.get(icon_id) for icon_id in sorted(set(icon_ids))}
+        sprite = SVGSpriteBuilder.build_sprite(
+            {icon_id: svg for icon_id, svg in icons.items() if svg is not None}
+        )
+        if None not in icons.values():
+            icon_store.put_sprite(sprite_key, sprite)
+
+    return Response(content=sprite, media_type="image/svg+xml", headers=headers)
+
+
+def _check_known_ids(icon_ids: List[str]) -> None:
+    unknown = [icon_id for icon_id in icon_ids if icon_store.get(icon_id) is None]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "UnknownIcon", "message": f"Unknown icon ids: {unknown}"},
+        )
+
 
 @router.post(
     "/generate",
@@ -35,7 +217,9 @@ router = APIRouter(prefix="/api/v1", tags=["svg-generation"])
 )
 async def generate(
     request: IconGenerationRequest,
+    http_request: Request,
     x_api_key: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
 ) -> IconGenerationResponse:
     """Generate SVG icon from text description using specified LLM provider."""
     try:
@@ -49,11 +233,11 @@ async def generate(
                 detail="API key required. Pass it in X-API-Key header.",
             )
 
-        svg_code, provider_used, model_used = svg_generator.generate_icon(
-            description=request.prompt,
-            provider=request.provider,
-            model=request.model,
-            api_key=x_api_key,
+        _check_auto_allowed(request.provider, x_api_key)
+
+        deadline = _deadline(x_request_timeout)
+        svg_code, provider_used, model_used = await _run_cancellable(
+            _generate_scheduled(request, x_api_key, deadline), http_request, deadline
         )
 
         logger.info(f"SVG generated successfully: {provider_used}/{model_used}")
@@ -62,6 +246,7 @@ async def generate(
             icon=svg_code,
             provider=provider_used,
             model=model_used,
+            id=_store_icon(request, svg_code),
         )
 
     except HTTPException:
@@ -93,7 +278,9 @@ async def generate(
 )
 async def generate_raw(
     request: IconGenerationRequest,
+    http_request: Request,
     x_api_key: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
 ) -> Response:
     """Generate SVG icon and return raw SVG code."""
     try:
@@ -107,16 +294,19 @@ async def generate_raw(
                 detail="API key required. Pass it in X-API-Key header.",
             )
 
-        svg_code, provider_used, model_used = svg_generator.generate_icon(
-            description=request.prompt,
-            provider=request.provider,
-            model=request.model,
-            api_key=x_api_key,
+        _check_auto_allowed(request.provider, x_api_key)
+
+        deadline = _deadline(x_request_timeout)
+        svg_code, provider_used, model_used = await _run_cancellable(
+            _generate_scheduled(request, x_api_key, deadline), http_request, deadline
         )
 
         logger.info(f"Raw SVG generated successfully: {provider_used}/{model_used}")
 
-        return Response(content=svg_code, media_type="image/svg+xml")
+        icon_id = _store_icon(request, svg_code)
+        headers = {"X-Icon-Id": icon_id} if icon_id else None
+
+        return Response(content=svg_code, media_type="image/svg+xml", headers=headers)
 
     except HTTPException:
         raise
@@ -132,3 +322,176 @@ async def generate_raw(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"error": error_type, "message": error_message},
         )
+
+
+@router.post(
+    "/sprite",
+    status_code=status.HTTP_200_OK,
+    summary="Bundle icons into one SVG sprite",
+    description="""
+    Returns a single SVG sprite containing one `<symbol id="icon-<id>">` per
+    icon, with each icon's `viewBox` preserved.
+
+    Icons are given as ids of previously generated icons and/or prompts.
+    Prompts already generated with the same provider and model are served
+    from storage; the rest are generated concurrently.
+
+    All new prompts are admitted against the tenant rate limit at once, so a
+    sprite can generate at most the tenant burst size of new icons; a 429
+    `Retry-After` covers the whole batch.
+
+    The `X-Icon-Ids` response header lists the icon id for each requested id
+    and prompt, in order; it is empty for prompts that failed or produced no
+    valid SVG.
+    """,
+)
+async def sprite(
+    request: SpriteRequest,
+    http_request: Request,
+    x_api_key: Optional[str] = Header(None),
+    x_request_timeout: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """Build an SVG sprite from stored and newly generated icons."""
+    try:
+        logger.info(
+            f"Building sprite: {len(request.ids)} ids, {len(request.prompts)} prompts"
+        )
+
+        if not x_api_key:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="API key required. Pass it in X-API-Key header.",
+            )
+
+        _check_auto_allowed(request.provider, x_api_key)
+
+        _check_known_ids(request.ids)
+
+        # Parse the timeout before reserving, so a bad header costs no tokens.
+        deadline = _deadline(x_request_timeout)
+
+        resolved = {
+            prompt: icon_store.lookup(
+                IconStore.prompt_key(prompt, request.provider, request.model)
+            )
+            for prompt in request.prompts
+        }
+        missing = [prompt for prompt, icon_id in resolved.items() if not icon_id]
+
+        if missing:
+            _reserve_batch(x_api_key, len(missing))
+
+            results = await _run_cancellable(
+                asyncio.gather(
+                    *(
+                        _generate_sprite_icon(request, prompt, x_api_key, deadline)
+                        for prompt in missing
+                    ),
+                    return_exceptions=True,
+                ),
+                http_request,
+                deadline,
+            )
+
+            # Keep whatever was generated; failed prompts are left out.
+            errors = []
+            for prompt, result in zip(missing, results):
+                if isinstance(result, BaseException):
+                    logger.warning(
+                        f"Sprite icon failed for {prompt!r}: "
+                        f"{type(result).__name__}: {result}"
+                    )
+                    errors.append(result)
+                    result = None
+                resolved[prompt] = result
+
+            if errors and not request.ids and not any(resolved.values()):
+                raise errors[0]
+
+        icon_ids = request.ids + [resolved[prompt] or "" for prompt in request.prompts]
+
+        logger.info(f"Sprite resolved: {icon_ids}")
+
+        return _sprite_response(
+            [icon_id for icon_id in icon_ids if icon_id],
+            if_none_match,
+            headers={"X-Icon-Ids": ",".join(icon_ids)},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_type = type(e).__name__
+        error_message = str(e)
+
+        logger.error(
+            f"Sprite generation failed: {error_type}: {error_message}", exc_info=True
+        )
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": error_type, "message": error_message},
+        )
+
+
+@router.get(
+    "/sprite",
+    status_code=status.HTTP_200_OK,
+    summary="Get an SVG sprite of stored icons",
+    description="""
+    Returns the SVG sprite for a comma-separated list of stored icon ids.
+
+    Icon ids are content hashes, so the response never changes for a given
+    set of ids and is served with long-lived cache headers. Reference icons
+    with `<use href="/api/v1/sprite?ids=...#icon-<id>"/>`.
+    """,
+)
+async def get_sprite(
+    ids: str = Query(..., description="Comma-separated icon ids"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """Serve an SVG sprite of already generated icons."""
+    icon_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not icon_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"error": "ValidationError", "message": "No icon ids given"},
+        )
+
+    _check_known_ids(icon_ids)
+
+    return _sprite_response(icon_ids, if_none_match)
+
+
+@router.get(
+    "/metrics",
+    summary="Scheduler metrics",
+    description="""
+    Returns admission scheduler state (active and queued work, per-tenant
+    admission counts and queue wait times) and counts of work cancelled by
+    client disconnects or deadlines. Tenants are identified by a hash of their
+    API key.
+    """,
+)
+async def metrics() -> dict:
+    """Return scheduler metrics."""
+    return {
+        "scheduler": scheduler.snapshot(),
+        "cancellation": cancellation_stats.snapshot(),
+    }
+
+
+@router.get(
+    "/router",
+    summary="Model router state",
+    description="""
+    Returns how `provider: "auto"` requests are routed: the objective, the
+    rolling latency, error, validation and token stats per candidate
+    provider/model, their current scores (lower is better) and the most
+    recent routing decisions.
+    """,
+)
+async def model_router() -> dict:
+    """Return model router stats and recent decisions."""
+    return svg_generator.router.snapshot()
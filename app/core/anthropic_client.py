@@ -1,6 +1,6 @@
 """Anthropic API client."""
 
-from anthropic import Anthropic
+from anthropic import NOT_GIVEN, APITimeoutError, AsyncAnthropic
 from typing import Dict, Any
 from app.core.config import settings
 
@@ -11,18 +11,19 @@ class AnthropicClient:
     def __init__(self, api_key: str = None, model: str = None):
         self.api_key = api_key
         self.model_name = model or "claude-3-5-sonnet-20241022"
-        self.client = Anthropic(api_key=api_key) if api_key else None
+        self.client = AsyncAnthropic(api_key=api_key) if api_key else None
 
-    def generate(
+    async def generate(
         self,
         prompt: str,
         temperature: float = None,
         max_tokens: int = None,
         api_key: str = None,
         model: str = None,
+        timeout: float = None,
         **kwargs,
     ) -> Dict[str, Any]:
-        """Generate completion from Anthropic."""
+        """Generate completion from Anthropic; cancelling the task aborts the call."""
         temperature = (
             temperature if temperature is not None else settings.llm_temperature
         )
@@ -33,15 +34,15 @@ class AnthropicClient:
         if not current_api_key:
             raise ValueError("Anthropic API key required")
 
-        client = Anthropic(api_key=current_api_key)
-
         try:
-            response = client.messages.create(
-                model=current_model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            async with AsyncAnthropic(api_key=current_api_key) as client:
+                response = await client.messages.create(
+                    model=current_model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    messages=[{"role": "user", "content": prompt}],
+                    timeout=timeout or NOT_GIVEN,
+                )
 
             return {
                 "response": response.content[0].text,
@@ -52,6 +53,8 @@ class AnthropicClient:
                     "output_tokens": response.usage.output_tokens,
                 },
             }
+        except APITimeoutError as e:
+            raise TimeoutError(f"Anthropic API timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"Anthropic API error: {str(e)}")
 
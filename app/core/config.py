@@ -1,5 +1,6 @@
 """Application configuration."""
 
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -23,6 +24,39 @@ class Settings(BaseSettings):
     gemini_api_key: str = ""
     gemini_model: str = "gemini-pro"
 
+    # provider="auto" spends the server's own provider keys, so it is off
+    # unless enabled; an empty allow-list admits every tenant once enabled.
+    router_enabled: bool = False
+    router_allowed_tenants: List[str] = []
+    router_openai_api_key: str = ""
+    router_anthropic_api_key: str = ""
+    router_candidates: List[str] = [
+        "gemini/gemini-1.5-flash",
+        "openai/gpt-4o-mini",
+        "anthropic/claude-3-5-haiku-latest",
+    ]
+    router_objective: str = "latency"
+    router_exploration: float = 0.05
+    router_ewma_alpha: float = 0.2
+    router_min_samples: int = 3
+    router_token_prices: Dict[str, float] = {}
+    router_weights: Dict[str, float] = {"latency": 1.0, "cost": 1.0, "failure": 1.0}
+
+    scheduler_max_concurrency: int = 8
+    scheduler_max_queue_depth: int = 200
+    scheduler_tenant_queue_depth: int = 50
+    scheduler_tenant_rate: float = 2.0
+    scheduler_tenant_burst: int = 20
+    scheduler_tenant_weights: Dict[str, float] = {}
+    scheduler_tenant_idle_sweep: float = 60.0
+
+    request_timeout: float = 60.0
+    request_timeout_max: float = 300.0
+    disconnect_poll_interval: float = 0.5
+
+    icon_store_max_icons: int = 5000
+    icon_store_max_sprites: int = 500
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,9 +1,17 @@
 """Google Gemini API client."""
 
+import threading
 import google.generativeai as genai
+from google.api_core.exceptions import DeadlineExceeded
+from google.generativeai import client as genai_client
 from typing import Dict, Any
 from app.core.config import settings
 
+# genai.configure() sets the API key process-wide. Calls for different tenants
+# hold this lock from configure() until their model has its own client, so a
+# concurrent call (on the event loop or a worker thread) cannot swap the key.
+_configure_lock = threading.Lock()
+
 
 class GeminiClient:
     """Google Gemini API client."""
@@ -18,16 +26,17 @@ class GeminiClient:
         else:
             self.model = None
 
-    def generate(
+    async def generate(
         self,
         prompt: str,
         temperature: float = None,
         max_tokens: int = None,
         api_key: str = None,
         model: str = None,
+        timeout: float = None,
         **kwargs,
     ) -> Dict[str, Any]:
-        """Generate completion from Gemini."""
+        """Generate completion from Gemini; cancelling the task aborts the call."""
         temperature = (
             temperature if temperature is not None else settings.llm_temperature
         )
@@ -38,8 +47,12 @@ class GeminiClient:
         if not current_api_key:
             raise ValueError("Gemini API key required")
 
-        genai.configure(api_key=current_api_key)
-        model_instance = genai.GenerativeModel(current_model)
+        with _configure_lock:
+            genai.configure(api_key=current_api_key)
+            model_instance = genai.GenerativeModel(current_model)
+            model_instance._async_client = (
+                genai_client.get_default_generative_async_client()
+            )
 
         generation_config = genai.GenerationConfig(
             temperature=temperature,
@@ -48,8 +61,10 @@ class GeminiClient:
         )
 
         try:
-            response = model_instance.generate_content(
-                prompt, generation_config=generation_config
+            response = await model_instance.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                request_options={"timeout": timeout} if timeout else None,
             )
 
             return {
@@ -58,7 +73,12 @@ class GeminiClient:
                 "finish_reason": response.candidates[0].finish_reason.name
                 if response.candidates
                 else None,
+                "usage": {
+                    "total_tokens": response.usage_metadata.total_token_count,
+                },
             }
+        except DeadlineExceeded as e:
+            raise TimeoutError(f"Gemini API timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
 
@@ -24,24 +24,36 @@ class OllamaClient:
         self.model = model or settings.ollama_model
         self.timeout = timeout or settings.ollama_timeout
 
-        self.client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
-
-    def generate(
-        self, prompt: str, temperature: float = None, max_tokens: int = None, **kwargs
+        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = None,
+        max_tokens: int = None,
+        timeout: float = None,
+        model: str = None,
+        **kwargs,
     ) -> Dict[str, Any]:
         """
         Generate a completion from the LLM.
 
+        Cancelling the calling task closes the connection, which stops Ollama
+        from generating the rest of the completion.
+
         Args:
             prompt: The prompt to send to the LLM
             temperature: Sampling temperature (0.0-1.0)
             max_tokens: Maximum tokens in response
+            timeout: Request timeout in seconds (default from client)
+            model: Model name (default from client)
             **kwargs: Additional Ollama parameters
 
         Returns:
             Dict containing the response and metadata
 
         Raises:
+            TimeoutError: If the request times out
             httpx.HTTPError: If the request fails
             json.JSONDecodeError: If response is not valid JSON
         """
@@ -49,9 +61,10 @@ class OllamaClient:
             temperature if temperature is not None else settings.llm_temperature
         )
         max_tokens = max_tokens if max_tokens is not None else settings.llm_max_tokens
+        timeout = timeout or self.timeout
 
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "prompt": prompt,
             "stream": False,
             "options": {
@@ -65,7 +78,9 @@ class OllamaClient:
             payload["options"].update(kwargs)
 
         try:
-            response = self.client.post("/api/generate", json=payload)
+            response = await self.client.post(
+                "/api/generate", json=payload, timeout=timeout
+            )
             response.raise_for_status()
             result = response.json()
 
@@ -79,7 +94,7 @@ class OllamaClient:
             }
 
         except httpx.TimeoutException as e:
-            raise Exception(f"LLM request timed out after {self.timeout}s: {str(e)}")
+            raise TimeoutError(f"LLM request timed out after {timeout:g}s: {str(e)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"LLM HTTP error: {str(e)}")
@@ -113,15 +128,15 @@ class OllamaClient:
 
         return None
 
-    def close(self):
+    async def close(self):
         """Close the HTTP client connection."""
-        self.client.close()
+        await self.client.aclose()
 
-    def __enter__(self):
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
 
 ollama_client = OllamaClient()
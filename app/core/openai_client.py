@@ -1,6 +1,6 @@
 """OpenAI API client."""
 
-from openai import OpenAI
+from openai import NOT_GIVEN, APITimeoutError, AsyncOpenAI
 from typing import Dict, Any
 from app.core.config import settings
 
@@ -11,18 +11,19 @@ class OpenAIClient:
     def __init__(self, api_key: str = None, model: str = None):
         self.api_key = api_key
         self.model_name = model or "gpt-4"
-        self.client = OpenAI(api_key=api_key) if api_key else None
+        self.client = AsyncOpenAI(api_key=api_key) if api_key else None
 
-    def generate(
+    async def generate(
         self,
         prompt: str,
         temperature: float = None,
         max_tokens: int = None,
         api_key: str = None,
         model: str = None,
+        timeout: float = None,
         **kwargs,
     ) -> Dict[str, Any]:
-        """Generate completion from OpenAI."""
+        """Generate completion from OpenAI; cancelling the task aborts the call."""
         temperature = (
             temperature if temperature is not None else settings.llm_temperature
         )
@@ -33,15 +34,15 @@ class OpenAIClient:
         if not current_api_key:
             raise ValueError("OpenAI API key required")
 
-        client = OpenAI(api_key=current_api_key)
-
         try:
-            response = client.chat.completions.create(
-                model=current_model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            async with AsyncOpenAI(api_key=current_api_key) as client:
+                response = await client.chat.completions.create(
+                    model=current_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout or NOT_GIVEN,
+                )
 
             return {
                 "response": response.choices[0].message.content,
@@ -53,6 +54,8 @@ class OpenAIClient:
                     "total_tokens": response.usage.total_tokens,
                 },
             }
+        except APITimeoutError as e:
+            raise TimeoutError(f"OpenAI API timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
 
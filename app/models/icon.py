@@ -1,17 +1,34 @@
 """SVG icon generation data models."""
 
-from typing import Literal
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
+
+Provider = Literal["openai", "gemini", "anthropic", "ollama", "auto"]
 
 
 class IconGenerationRequest(BaseModel):
     """SVG icon generation request."""
 
     prompt: str = Field(..., description="Icon description", examples=["a rocket ship"])
-    provider: Literal["openai", "gemini", "anthropic", "ollama"] = Field(
-        ..., description="LLM provider", examples=["openai"]
+    provider: Provider = Field(
+        ...,
+        description='LLM provider, or "auto" to route to the best available model',
+        examples=["openai"],
+    )
+    model: Optional[str] = Field(
+        None, description="Model name (not used with auto)", examples=["gpt-4"]
     )
-    model: str = Field(..., description="Model name", examples=["gpt-4"])
+    priority: Literal["interactive", "batch"] = Field(
+        "interactive",
+        description="Scheduling lane; interactive requests are served before batch",
+        examples=["interactive"],
+    )
+
+    @model_validator(mode="after")
+    def check_model(self) -> "IconGenerationRequest":
+        if self.provider != "auto" and not self.model:
+            raise ValueError("model is required unless provider is auto")
+        return self
 
 
 class IconGenerationResponse(BaseModel):
@@ -20,3 +37,44 @@ class IconGenerationResponse(BaseModel):
     icon: str = Field(..., description="Generated SVG code")
     provider: str = Field(..., description="Provider used")
     model: str = Field(..., description="Model used")
+    id: Optional[str] = Field(
+        None, description="Icon id for use with the sprite endpoint"
+    )
+
+
+class SpriteRequest(BaseModel):
+    """SVG sprite request."""
+
+    ids: List[str] = Field(
+        default_factory=list,
+        max_length=200,
+        description="Ids of previously generated icons",
+        examples=[["3f2a9c1e7b6d4a08"]],
+    )
+    prompts: List[str] = Field(
+        default_factory=list,
+        max_length=200,
+        description="Icon descriptions; stored icons are reused, others generated",
+        examples=[["a rocket ship", "a coffee cup"]],
+    )
+    provider: Optional[Provider] = Field(
+        None, description="LLM provider for prompts", examples=["openai"]
+    )
+    model: Optional[str] = Field(
+        None, description="Model name for prompts", examples=["gpt-4"]
+    )
+    priority: Literal["interactive", "batch"] = Field(
+        "interactive",
+        description="Scheduling lane; interactive requests are served before batch",
+        examples=["interactive"],
+    )
+
+    @model_validator(mode="after")
+    def check_icons(self) -> "SpriteRequest":
+        if not self.ids and not self.prompts:
+            raise ValueError("At least one of ids or prompts is required")
+        if self.prompts and not self.provider:
+            raise ValueError("provider is required with prompts")
+        if self.prompts and self.provider != "auto" and not self.model:
+            raise ValueError("model is required unless provider is auto")
+        return self
@@ -0,0 +1,111 @@
+"""Request deadlines and client-disconnect cancellation."""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+from fastapi import Request
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEADLINE_EXCEEDED = "deadline_exceeded"
+CLIENT_DISCONNECTED = "client_disconnected"
+
+
+class RequestCancelled(Exception):
+    """Raised when work is abandoned because of a disconnect or deadline."""
+
+    def __init__(self, reason: str, elapsed: float):
+        super().__init__(f"Request cancelled ({reason}) after {elapsed:.1f}s")
+        self.reason = reason
+        self.elapsed = elapsed
+
+
+class CancellationStats:
+    """Counters for work that was cancelled before it completed."""
+
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.seconds: Counter = Counter()
+        self.provider_calls: Counter = Counter()
+
+    def record_request(self, reason: str, elapsed: float) -> None:
+        self.requests[reason] += 1
+        self.seconds[reason] += elapsed
+
+    def record_provider_call(self, provider: str) -> None:
+        self.provider_calls[provider] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.requests),
+            "seconds": {
+                reason: round(seconds, 3) for reason, seconds in self.seconds.items()
+            },
+            "provider_calls": dict(self.provider_calls),
+        }
+
+
+def request_deadline(timeout: Optional[float] = None) -> float:
+    """
+    Compute an absolute deadline on the time.monotonic() clock.
+
+    Args:
+        timeout: Requested timeout in seconds (default from config, capped at
+            the configured maximum)
+    """
+    timeout = min(timeout or settings.request_timeout, settings.request_timeout_max)
+    return time.monotonic() + timeout
+
+
+async def run_cancellable(work: Awaitable[T], request: Request, deadline: float) -> T:
+    """
+    Run work until it completes, the deadline passes or the client disconnects.
+
+    On deadline expiry or disconnect the work is cancelled, which aborts any
+    in-flight provider call and frees its scheduler slot or queue entry.
+
+    Raises:
+        RequestCancelled: If the work was cancelled
+    """
+    task = asyncio.ensure_future(work)
+    started = time.monotonic()
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                reason = DEADLINE_EXCEEDED
+                break
+
+            done, _ = await asyncio.wait(
+                {task}, timeout=min(remaining, settings.disconnect_poll_interval)
+            )
+            if done:
+                return task.result()
+
+            if await request.is_disconnected():
+                reason = CLIENT_DISCONNECTED
+                break
+    except BaseException:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+
+    if not task.cancel():
+        # Finished while we were deciding to give up; use the result.
+        return task.result()
+    await asyncio.gather(task, return_exceptions=True)
+
+    elapsed = time.monotonic() - started
+    cancellation_stats.record_request(reason, elapsed)
+    logger.warning(f"Cancelled request work: {reason} after {elapsed:.1f}s")
+    raise RequestCancelled(reason, elapsed)
+
+
+# Create singleton instance
+cancellation_stats = CancellationStats()
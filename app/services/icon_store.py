@@ -0,0 +1,93 @@
+"""In-memory storage for generated SVG icons and sprites."""
+
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+from app.core.config import settings
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class IconStore:
+    """
+    Bounded LRU store of generated icons.
+
+    Icons are addressed by a hash of their SVG code, so an id always refers to
+    the same content. A second index maps (provider, model, prompt) to the
+    latest icon generated for it, and built sprites are cached by the sorted
+    set of icon ids they contain.
+    """
+
+    def __init__(self, max_icons: int = None, max_sprites: int = None):
+        self.max_icons = max_icons or settings.icon_store_max_icons
+        self.max_sprites = max_sprites or settings.icon_store_max_sprites
+
+        self._icons: OrderedDict[str, str] = OrderedDict()
+        self._prompts: OrderedDict[str, str] = OrderedDict()
+        self._sprites: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def prompt_key(prompt: str, provider: str, model: Optional[str]) -> str:
+        """Key identifying a prompt for a given provider and model."""
+        return _digest(provider, model or "", " ".join(prompt.lower().split()))
+
+    @staticmethod
+    def sprite_key(icon_ids: Iterable[str]) -> str:
+        """Key identifying a sprite by the set of icons it contains."""
+        return _digest(*sorted(set(icon_ids)))
+
+    @staticmethod
+    def _touch(cache: OrderedDict, key: str, value: str, limit: int) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def put(self, svg_code: str, prompt_key: Optional[str] = None) -> str:
+        """
+        Store an icon.
+
+        Args:
+            svg_code: Validated SVG code
+            prompt_key: Optional prompt key (see prompt_key) to index it under
+
+        Returns:
+            The icon id
+        """
+        icon_id = _digest(svg_code)
+        self._touch(self._icons, icon_id, svg_code, self.max_icons)
+        if prompt_key:
+            self._touch(self._prompts, prompt_key, icon_id, self.max_icons)
+        return icon_id
+
+    def get(self, icon_id: str) -> Optional[str]:
+        """Return the SVG code for an icon id, if stored."""
+        svg_code = self._icons.get(icon_id)
+        if svg_code is not None:
+            self._icons.move_to_end(icon_id)
+        return svg_code
+
+    def lookup(self, prompt_key: str) -> Optional[str]:
+        """Return the id of the latest icon stored for a prompt key, if any."""
+        icon_id = self._prompts.get(prompt_key)
+        if icon_id is None or icon_id not in self._icons:
+            return None
+        self._prompts.move_to_end(prompt_key)
+        return icon_id
+
+    def get_sprite(self, sprite_key: str) -> Optional[str]:
+        """Return a cached sprite document, if any."""
+        sprite = self._sprites.get(sprite_key)
+        if sprite is not None:
+            self._sprites.move_to_end(sprite_key)
+        return sprite
+
+    def put_sprite(self, sprite_key: str, sprite: str) -> None:
+        """Cache a sprite document."""
+        self._touch(self._sprites, sprite_key, sprite, self.max_sprites)
+
+
+# Create singleton instance
+icon_store = IconStore()
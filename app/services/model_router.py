@@ -0,0 +1,312 @@
+"""Latency and cost aware routing across LLM providers."""
+
+import logging
+import math
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVES = ("latency", "cost", "weighted")
+
+# One-sided z-score for estimating p95 from a mean and variance.
+_Z_95 = 1.645
+
+
+def _provider_credentials(provider: str) -> Optional[str]:
+    """Server-side API key for a provider; empty for Ollama, None if missing."""
+    if provider == "openai":
+        return settings.router_openai_api_key or None
+    if provider == "anthropic":
+        return settings.router_anthropic_api_key or None
+    if provider == "gemini":
+        return settings.gemini_api_key or None
+    return "" if provider == "ollama" else None
+
+
+def _total_tokens(llm_response: Dict[str, Any]) -> Optional[int]:
+    """Total tokens reported by a provider client response, if any."""
+    usage = llm_response.get("usage") or {}
+    if "total_tokens" in usage:
+        return usage["total_tokens"]
+    if "input_tokens" in usage:
+        return usage["input_tokens"] + usage.get("output_tokens", 0)
+    if "eval_count" in llm_response:
+        return llm_response.get("prompt_eval_count", 0) + llm_response["eval_count"]
+    return None
+
+
+@dataclass
+class ModelStats:
+    """Exponentially weighted moving statistics for one (provider, model)."""
+
+    alpha: float
+    samples: int = 0
+    latency_samples: int = 0
+    latency: float = 0.0
+    latency_var: float = 0.0
+    error_rate: float = 0.0
+    valid_rate: float = 1.0
+    tokens: float = 0.0
+
+    def _ewma(self, current: float, value: float, count: int = None) -> float:
+        if (count or self.samples) == 1:
+            return value
+        return current + self.alpha * (value - current)
+
+    def record(
+        self,
+        latency: float,
+        error: bool,
+        valid: bool = False,
+        tokens: Optional[int] = None,
+        timed_out: bool = False,
+    ) -> None:
+        """
+        Record one call.
+
+        Latency is only taken from calls that completed or ran into the
+        deadline; other failures tend to be fast (bad key, unknown model)
+        and would make the candidate look quicker than it is.
+        """
+        self.samples += 1
+        error = error or timed_out
+
+        if not error or timed_out:
+            self.latency_samples += 1
+            deviation = latency - self.latency
+            self.latency = self._ewma(self.latency, latency, self.latency_samples)
+            if self.latency_samples > 1:
+                self.latency_var = (1 - self.alpha) * (
+                    self.latency_var + self.alpha * deviation**2
+                )
+
+        self.error_rate = self._ewma(self.error_rate, 1.0 if error else 0.0)
+        if not error:
+            self.valid_rate = self._ewma(self.valid_rate, 1.0 if valid else 0.0)
+        if tokens is not None:
+            self.tokens = (
+                self._ewma(self.tokens, float(tokens)) if self.tokens else tokens
+            )
+
+    @property
+    def p95_latency(self) -> float:
+        return self.latency + _Z_95 * math.sqrt(self.latency_var)
+
+    @property
+    def success_rate(self) -> float:
+        """Probability that a call returns a valid SVG."""
+        return (1 - self.error_rate) * self.valid_rate
+
+
+class ModelRouter:
+    """
+    Picks a (provider, model) for provider="auto" requests.
+
+    Stats are only updated from routed calls, which use server-side
+    credentials, so a tenant's bad API key cannot skew routing for everyone.
+    Candidates with too few samples are tried first; after that a small
+    exploration share goes to a random candidate to keep stats fresh.
+    """
+
+    def __init__(
+        self,
+        candidates: Optional[List[str]] = None,
+        objective: str = None,
+        exploration: float = None,
+        alpha: float = None,
+        min_samples: int = None,
+    ):
+        self.candidates: List[Tuple[str, str]] = []
+        for candidate in candidates or settings.router_candidates:
+            provider, _, model = candidate.partition("/")
+            if not model:
+                raise ValueError(
+                    f"Router candidate must be provider/model: {candidate}"
+                )
+            self.candidates.append((provider, model))
+
+        self.objective = objective or settings.router_objective
+        if self.objective not in OBJECTIVES:
+            raise ValueError(f"Unknown router objective: {self.objective}")
+        self.exploration = (
+            exploration if exploration is not None else settings.router_exploration
+        )
+        self.min_samples = (
+            min_samples if min_samples is not None else settings.router_min_samples
+        )
+
+        alpha = alpha or settings.router_ewma_alpha
+        self.stats: Dict[Tuple[str, str], ModelStats] = {
+            candidate: ModelStats(alpha=alpha) for candidate in self.candidates
+        }
+        self.decisions: deque = deque(maxlen=50)
+        # Routed calls dispatched but not yet finished, per candidate.
+        self.in_flight: Counter = Counter()
+
+    def _cost(self, candidate: Tuple[str, str]) -> float:
+        """Expected cost in USD of one call."""
+        price = settings.router_token_prices.get("/".join(candidate), 0.0)
+        return self.stats[candidate].tokens / 1000 * price
+
+    def _scores(self, candidates: List[Tuple[str, str]]) -> Dict[str, float]:
+        """Score candidates under the objective; lower is better."""
+        # Divide by the success rate to get the expected latency/cost of
+        # obtaining one valid icon, so fast or cheap failures do not win.
+        success = {c: max(self.stats[c].success_rate, 0.01) for c in candidates}
+        # A candidate that has only failed fast has no latency yet; assume it
+        # is as slow as the slowest measured one rather than instant.
+        p95 = {
+            c: self.stats[c].p95_latency
+            for c in candidates
+            if self.stats[c].latency_samples
+        }
+        slowest = max(p95.values(), default=0.0)
+        latency = {c: p95.get(c, slowest) / success[c] for c in candidates}
+        cost = {c: self._cost(c) / success[c] for c in candidates}
+
+        if self.objective == "latency":
+            scores = latency
+        elif self.objective == "cost":
+            # Break ties between equally priced candidates on latency.
+            scores = {c: cost[c] + latency[c] * 1e-9 for c in candidates}
+        else:
+            weights = settings.router_weights
+            metrics = {
+                "latency": latency,
+                "cost": cost,
+                "failure": {c: 1 - self.stats[c].success_rate for c in candidates},
+            }
+            scores = {c: 0.0 for c in candidates}
+            for name, values in metrics.items():
+                peak = max(values.values())
+                if peak > 0:
+                    for c in candidates:
+                        scores[c] += weights.get(name, 0.0) * values[c] / peak
+
+        return {"/".join(c): round(score, 6) for c, score in scores.items()}
+
+    @staticmethod
+    def allows(tenant: str) -> bool:
+        """Whether a tenant may use auto routing, and so the server's keys."""
+        if not settings.router_enabled:
+            return False
+        allowed = settings.router_allowed_tenants
+        return not allowed or tenant in allowed
+
+    @staticmethod
+    def credentials(provider: str) -> Optional[str]:
+        """API key to call a routed provider with; None when none is needed."""
+        return _provider_credentials(provider) or None
+
+    def available(self) -> List[Tuple[str, str]]:
+        """Candidates the server can call with its own credentials."""
+        return [c for c in self.candidates if _provider_credentials(c[0]) is not None]
+
+    def choose(self) -> Tuple[str, str]:
+        """
+        Choose a (provider, model) for the next request.
+
+        The choice counts as in flight until release() is called for it.
+
+        Raises:
+            ValueError: If no candidate has server-side credentials
+        """
+        candidates = self.available()
+        if not candidates:
+            raise ValueError(
+                "No provider available for auto routing; "
+                "configure router candidates and provider API keys"
+            )
+
+        scores = {}
+        cold = [c for c in candidates if self.stats[c].samples < self.min_samples]
+        if cold:
+            # Count in-flight calls so a burst spreads across cold candidates.
+            choice = min(cold, key=lambda c: self.stats[c].samples + self.in_flight[c])
+            reason = "cold_start"
+        elif random.random() < self.exploration:
+            choice = random.choice(candidates)
+            reason = "explore"
+        else:
+            scores = self._scores(candidates)
+            choice = min(candidates, key=lambda c: scores["/".join(c)])
+            reason = self.objective
+
+        self.decisions.append(
+            {
+                "time": time.time(),
+                "choice": "/".join(choice),
+                "reason": reason,
+                "scores": scores,
+            }
+        )
+        logger.info(f"Routed to {choice[0]}/{choice[1]} ({reason})")
+        self.in_flight[choice] += 1
+        return choice
+
+    def release(self, provider: str, model: str) -> None:
+        """Mark a routed call returned by choose() as finished."""
+        candidate = (provider, model)
+        if self.in_flight[candidate] > 0:
+            self.in_flight[candidate] -= 1
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        latency: float,
+        error: bool = False,
+        valid: bool = False,
+        llm_response: Optional[Dict[str, Any]] = None,
+        timed_out: bool = False,
+    ) -> None:
+        """
+        Record the outcome of a routed call.
+
+        Args:
+            error: The call failed; its latency is ignored
+            valid: The call returned a valid SVG
+            llm_response: Provider client response, for token usage
+            timed_out: The call ran into the request deadline; counts as an
+                error, with the time until the deadline as its latency
+        """
+        stats = self.stats.get((provider, model))
+        if stats is None:
+            return
+
+        tokens = _total_tokens(llm_response) if llm_response else None
+        stats.record(
+            latency, error=error, valid=valid, tokens=tokens, timed_out=timed_out
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return routing configuration, per-candidate stats and recent decisions."""
+        available = self.available()
+        scored = [c for c in available if self.stats[c].samples]
+        scores = self._scores(scored) if scored else {}
+
+        return {
+            "objective": self.objective,
+            "exploration": self.exploration,
+            "candidates": {
+                "/".join(c): {
+                    "available": c in available,
+                    "samples": stats.samples,
+                    "in_flight": self.in_flight[c],
+                    "latency_seconds": round(stats.latency, 3),
+                    "p95_latency_seconds": round(stats.p95_latency, 3),
+                    "error_rate": round(stats.error_rate, 4),
+                    "validation_success_rate": round(stats.valid_rate, 4),
+                    "tokens": round(stats.tokens, 1),
+                    "cost_usd": round(self._cost(c), 6),
+                    "score": scores.get("/".join(c)),
+                }
+                for c, stats in self.stats.items()
+            },
+            "decisions": list(self.decisions),
+        }
@@ -0,0 +1,379 @@
+"""Per-tenant admission scheduler for SVG generation."""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lanes in dispatch order: interactive work always goes ahead of batch work.
+PRIORITIES = ("interactive", "batch")
+
+
+def tenant_id(api_key: str) -> str:
+    """Derive a stable tenant identifier from an API key without exposing it."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused by rate limiting or queue bounds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}, retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the bucket full.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: float, count: int = 1) -> float:
+        """
+        Take count tokens if available.
+
+        Returns:
+            0.0 if the tokens were taken, otherwise seconds until they are
+            available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+
+        return (count - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled to capacity."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+@dataclass
+class TenantStats:
+    """Admission and queue wait counters for one tenant."""
+
+    admitted: int = 0
+    rate_limited: int = 0
+    queue_full: int = 0
+    cancelled: int = 0
+    wait_count: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    wait_last: float = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.wait_count += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.wait_last = wait
+
+
+@dataclass
+class _Tenant:
+    bucket: TokenBucket
+    weight: float
+    stats: TenantStats = field(default_factory=TenantStats)
+    queued: int = 0
+    last_finish: Dict[str, float] = field(
+        default_factory=lambda: {lane: 0.0 for lane in PRIORITIES}
+    )
+    # Finish tag of the latest waiter handed a slot, per lane.
+    dispatched_finish: Dict[str, float] = field(
+        default_factory=lambda: {lane: 0.0 for lane in PRIORITIES}
+    )
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    seq: int
+    start_tag: float = field(compare=False)
+    tenant: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class AdmissionScheduler:
+    """
+    Admits generation work per tenant.
+
+    Each tenant gets a token bucket rate limit. Admitted requests wait for one
+    of a fixed number of worker slots; waiting requests are ordered by
+    start-time weighted fair queuing within their priority lane, and the
+    interactive lane is always served before the batch lane.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        max_queue_depth: int = None,
+        tenant_queue_depth: int = None,
+        tenant_rate: float = None,
+        tenant_burst: int = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrency = max_concurrency or settings.scheduler_max_concurrency
+        self.max_queue_depth = max_queue_depth or settings.scheduler_max_queue_depth
+        self.tenant_queue_depth = (
+            tenant_queue_depth or settings.scheduler_tenant_queue_depth
+        )
+        self.tenant_rate = tenant_rate or settings.scheduler_tenant_rate
+        self.tenant_burst = tenant_burst or settings.scheduler_tenant_burst
+        self.tenant_weights = (
+            tenant_weights
+            if tenant_weights is not None
+            else settings.scheduler_tenant_weights
+        )
+
+        self._tenants: Dict[str, _Tenant] = {}
+        self._lanes: Dict[str, List[_Waiter]] = {lane: [] for lane in PRIORITIES}
+        self._virtual_time: Dict[str, float] = {lane: 0.0 for lane in PRIORITIES}
+        self._queued = 0
+        self._active = 0
+        self._seq = itertools.count()
+        self._last_sweep = time.monotonic()
+        # Rolling estimate of how long a slot is held, used for Retry-After.
+        self._service_time = 5.0
+
+    def _sweep_idle_tenants(self, now: float) -> None:
+        """
+        Forget tenants with nothing queued and a full bucket.
+
+        Such tenants carry no rate limit or queue state, so dropping them only
+        resets their metrics; it keeps memory bounded under many API keys.
+        """
+        if now - self._last_sweep < settings.scheduler_tenant_idle_sweep:
+            return
+        self._last_sweep = now
+
+        idle = [
+            tenant
+            for tenant, state in self._tenants.items()
+            if not state.queued and state.bucket.is_full(now)
+        ]
+        for tenant in idle:
+            del self._tenants[tenant]
+        if idle:
+            logger.info(f"Evicted {len(idle)} idle tenants")
+
+    def _tenant(self, tenant: str) -> _Tenant:
+        state = self._tenants.get(tenant)
+        if state is None:
+            self._sweep_idle_tenants(time.monotonic())
+            state = _Tenant(
+                bucket=TokenBucket(self.tenant_rate, self.tenant_burst),
+                weight=self.tenant_weights.get(tenant, 1.0),
+            )
+            self._tenants[tenant] = state
+        return state
+
+    def _queue_retry_after(self) -> float:
+        """Estimate how long until the queue has drained enough to admit."""
+        return (self._queued / self.max_concurrency + 1) * self._service_time
+
+    def reserve(self, tenant: str, count: int) -> None:
+        """
+        Take rate limit tokens for a batch up front, all or nothing.
+
+        Slots for the batch are then acquired with charge=False.
+
+        Raises:
+            ValueError: If count exceeds the tenant burst size
+            AdmissionRejected: If the tenant lacks tokens; retry_after covers
+                the whole batch
+        """
+        if count > self.tenant_burst:
+            raise ValueError(
+                f"Batch of {count} exceeds tenant burst size {self.tenant_burst}"
+            )
+
+        state = self._tenant(tenant)
+        retry_after = state.bucket.try_acquire(time.monotonic(), count)
+        if retry_after:
+            state.stats.rate_limited += 1
+            logger.warning(f"Tenant rate limited for batch of {count}: {tenant}")
+            raise AdmissionRejected("Tenant rate limit exceeded", retry_after)
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, priority: str = "interactive", charge=True):
+        """
+        Hold a worker slot for the duration of the block.
+
+        Args:
+            tenant: Tenant identifier (see tenant_id)
+            priority: "interactive" or "batch"
+            charge: Take a rate limit token; False when already reserved
+
+        Raises:
+            AdmissionRejected: If the tenant is rate limited or the queue is full
+        """
+        await self._acquire(tenant, priority, charge)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._release()
+
+    async def _acquire(self, tenant: str, priority: str, charge: bool) -> None:
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        # Creating the tenant starts its bucket, so read the clock after that.
+        state = self._tenant(tenant)
+        now = time.monotonic()
+
+        immediate = self._active < self.max_concurrency and not self._queued
+
+        if not immediate and self._queued >= self.max_queue_depth:
+            state.stats.queue_full += 1
+            logger.warning(f"Queue full, rejecting tenant {tenant}")
+            raise AdmissionRejected("Queue is full", self._queue_retry_after())
+
+        if not immediate and state.queued >= self.tenant_queue_depth:
+            state.stats.queue_full += 1
+            logger.warning(f"Tenant queue full: {tenant}")
+            raise AdmissionRejected(
+                "Tenant queue is full",
+                (state.queued / self.max_concurrency + 1) * self._service_time,
+            )
+
+        retry_after = state.bucket.try_acquire(now) if charge else 0.0
+        if retry_after:
+            state.stats.rate_limited += 1
+            logger.warning(f"Tenant rate limited: {tenant}")
+            raise AdmissionRejected("Tenant rate limit exceeded", retry_after)
+
+        if immediate:
+            self._active += 1
+            state.stats.admitted += 1
+            state.stats.record_wait(0.0)
+            return
+
+        start_tag = max(self._virtual_time[priority], state.last_finish[priority])
+        finish_tag = start_tag + 1.0 / state.weight
+        state.last_finish[priority] = finish_tag
+
+        waiter = _Waiter(
+            finish_tag=finish_tag,
+            seq=next(self._seq),
+            start_tag=start_tag,
+            tenant=tenant,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=now,
+        )
+        heapq.heappush(self._lanes[priority], waiter)
+        self._queued += 1
+        state.queued += 1
+        state.stats.admitted += 1
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                # Still queued: drop it here, the dispatcher skips the entry.
+                self._queued -= 1
+                state.queued -= 1
+                state.stats.cancelled += 1
+                self._rewind_finish(tenant, state, priority)
+            else:
+                # Slot was handed over just as we were cancelled; give it back.
+                self._release()
+            raise
+
+    def _rewind_finish(self, tenant: str, state: _Tenant, lane: str) -> None:
+        """
+        Recompute a tenant's latest finish tag after a queued waiter left.
+
+        Without this, abandoned requests would keep pushing the tenant's
+        future requests behind everyone else's.
+        """
+        state.last_finish[lane] = max(
+            (
+                waiter.finish_tag
+                for waiter in self._lanes[lane]
+                if waiter.tenant == tenant and not waiter.future.done()
+            ),
+            default=state.dispatched_finish[lane],
+        )
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, interactive lane first."""
+        now = time.monotonic()
+        for lane in PRIORITIES:
+            heap = self._lanes[lane]
+            while heap and self._active < self.max_concurrency:
+                waiter = heapq.heappop(heap)
+                if waiter.future.done():
+                    continue
+
+                state = self._tenants[waiter.tenant]
+                self._queued -= 1
+                state.queued -= 1
+                self._virtual_time[lane] = waiter.start_tag
+                state.dispatched_finish[lane] = max(
+                    state.dispatched_finish[lane], waiter.finish_tag
+                )
+                state.stats.record_wait(now - waiter.enqueued_at)
+
+                self._active += 1
+                waiter.future.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return scheduler state and per-tenant queue wait metrics."""
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self._queued,
+            "max_queue_depth": self.max_queue_depth,
+            "service_time_seconds": round(self._service_time, 3),
+            "tenants": {
+                tenant: {
+                    "weight": state.weight,
+                    "queued": state.queued,
+                    "admitted": state.stats.admitted,
+                    "rate_limited": state.stats.rate_limited,
+                    "queue_full": state.stats.queue_full,
+                    "cancelled_while_queued": state.stats.cancelled,
+                    "queue_wait_seconds": {
+                        "count": state.stats.wait_count,
+                        "avg": round(state.stats.wait_total / state.stats.wait_count, 3)
+                        if state.stats.wait_count
+                        else 0.0,
+                        "max": round(state.stats.wait_max, 3),
+                        "last": round(state.stats.wait_last, 3),
+                    },
+                }
+                for tenant, state in self._tenants.items()
+            },
+        }
+
+
+# Create singleton instance
+scheduler = AdmissionScheduler()
@@ -1,10 +1,14 @@
 """SVG Icon Generator Service."""
 
+import asyncio
 import logging
 import re
+import time
 from typing import Optional, Tuple
 from xml.etree import ElementTree as ET
 from app.core.config import settings
+from app.services.cancellation import cancellation_stats
+from app.services.model_router import ModelRouter
 from app.services.svg_prompt_builder import SVGPromptBuilder
 
 logger = logging.getLogger(__name__)
@@ -16,6 +20,7 @@ class SVGGenerator:
     def __init__(self):
         """Initialize the SVG generator."""
         self.prompt_builder = SVGPromptBuilder()
+        self.router = ModelRouter()
 
     def _get_client(
         self, provider: Optional[str] = None, api_key: Optional[str] = None
@@ -40,31 +45,43 @@ class SVGGenerator:
 
             return ollama_client, "ollama"
 
-    def generate_icon(
+    async def generate_icon(
         self,
         description: str,
         provider: Optional[str] = None,
         model: Optional[str] = None,
         api_key: Optional[str] = None,
+        deadline: Optional[float] = None,
     ) -> Tuple[str, str, str]:
         """
         Generate an SVG icon based on a text description.
 
         Args:
             description: Text description of the desired icon
-            provider: LLM provider to use ("openai", "gemini", "anthropic", "ollama")
-            model: Specific model to use
-            api_key: API key for the provider
+            provider: LLM provider to use ("openai", "gemini", "anthropic", "ollama",
+                or "auto" to let the router pick a provider and model)
+            model: Specific model to use (ignored for "auto")
+            api_key: API key for the provider (ignored for "auto", which uses
+                server-side credentials)
+            deadline: Absolute time.monotonic() deadline; the time left is used
+                as the provider call timeout
 
         Returns:
             Tuple of (SVG code, provider used, model used)
 
         Raises:
+            TimeoutError: If the deadline passed before the provider call
             Exception: If generation fails
         """
+        routed = provider == "auto"
+        chosen = None
         try:
             logger.info(f"Generating SVG icon for: {description}")
 
+            if routed:
+                chosen = provider, model = self.router.choose()
+                api_key = self.router.credentials(provider)
+
             # Get the appropriate client
             client, provider_used = self._get_client(provider, api_key)
             logger.info(f"Using provider: {provider_used}")
@@ -87,8 +104,38 @@ class SVGGenerator:
             if model:
                 gen_params["model"] = model
 
+            # Bound the provider call by whatever is left of the deadline
+            if deadline is not None:
+                gen_params["timeout"] = deadline - time.monotonic()
+                if gen_params["timeout"] <= 0:
+                    raise TimeoutError("Request deadline passed before LLM call")
+
             # Call LLM
-            llm_response = client.generate(**gen_params)
+            started = time.monotonic()
+            try:
+                llm_response = await client.generate(**gen_params)
+            except asyncio.CancelledError:
+                logger.info(f"LLM call cancelled: {provider_used}")
+                cancellation_stats.record_provider_call(provider_used)
+                # Cancelled at the deadline rather than by a disconnect: count
+                # it, or a candidate slower than the deadline never gets a
+                # sample and stays cold forever.
+                if routed and deadline is not None and time.monotonic() >= deadline:
+                    self.router.record(
+                        provider_used, model, time.monotonic() - started, timed_out=True
+                    )
+                raise
+            except Exception as e:
+                if routed:
+                    self.router.record(
+                        provider_used,
+                        model,
+                        time.monotonic() - started,
+                        error=True,
+                        timed_out=isinstance(e, TimeoutError),
+                    )
+                raise
+            latency = time.monotonic() - started
 
             response_text = llm_response["response"]
             model_used = llm_response.get("model", model or "unknown")
@@ -99,13 +146,24 @@ class SVGGenerator:
             # Extract SVG code
             svg_code = self._extract_svg(response_text)
 
+            # Validate SVG
+            valid = bool(svg_code) and self._validate_svg(svg_code)
+
+            if routed:
+                self.router.record(
+                    provider_used,
+                    model,
+                    latency,
+                    valid=valid,
+                    llm_response=llm_response,
+                )
+
             if not svg_code:
                 logger.warning("No valid SVG found in response")
                 logger.warning(f"Full response was: {response_text}")
                 return self._fallback_svg(description), provider_used, model_used
 
-            # Validate SVG
-            if not self._validate_svg(svg_code):
+            if not valid:
                 logger.warning("SVG validation failed, using fallback")
                 logger.warning(f"Invalid SVG: {svg_code}")
                 return self._fallback_svg(description), provider_used, model_used
@@ -117,6 +175,9 @@ class SVGGenerator:
             logger.error(f"SVG generation error: {str(e)}", exc_info=True)
             # Re-raise the exception so it can be handled by the route
             raise
+        finally:
+            if chosen:
+                self.router.release(*chosen)
 
     def _extract_svg(self, text: str) -> Optional[str]:
         """Extract SVG code from LLM response."""
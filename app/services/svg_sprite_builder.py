@@ -0,0 +1,120 @@
+"""Sprite Builder for bundling SVG icons into one document."""
+
+import logging
+import re
+from typing import Dict, Optional
+from xml.etree import ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+_URL_REF = re.compile(r"url\(\s*(['\"]?)#([^)'\"\s]+)\1\s*\)")
+
+# Root attributes that only size or identify a standalone <svg>; everything else
+# (fill, stroke, stroke-width, ...) is carried over onto the <symbol>.
+_DROPPED_ATTRIBUTES = {"id", "width", "height", "x", "y", "version", "viewBox"}
+
+
+class SVGSpriteBuilder:
+    """Builds SVG sprites out of individual icons."""
+
+    @staticmethod
+    def parse_icon(svg_code: str) -> Optional[ET.Element]:
+        """Parse SVG code into an element tree with the SVG namespace stripped."""
+        try:
+            root = ET.fromstring(svg_code)
+        except ET.ParseError as e:
+            logger.warning(f"Cannot parse icon for sprite: {str(e)}")
+            return None
+
+        prefix = f"{{{SVG_NS}}}"
+        for element in root.iter():
+            if isinstance(element.tag, str) and element.tag.startswith(prefix):
+                element.tag = element.tag[len(prefix) :]
+
+        if root.tag != "svg":
+            return None
+
+        return root
+
+    @staticmethod
+    def _view_box(root: ET.Element) -> str:
+        view_box = root.get("viewBox")
+        if view_box:
+            return view_box
+
+        width = root.get("width", "").removesuffix("px")
+        height = root.get("height", "").removesuffix("px")
+        try:
+            return f"0 0 {float(width):g} {float(height):g}"
+        except ValueError:
+            return "0 0 24 24"
+
+    @staticmethod
+    def _scope_ids(root: ET.Element, prefix: str) -> None:
+        """
+        Prefix internal ids so definitions from different icons do not collide.
+
+        Rewrites id attributes and the url(#...) and href="#..." references
+        that point at them; references to unknown ids are left alone.
+        """
+        ids = {
+            element.get("id"): f"{prefix}-{element.get('id')}"
+            for element in root.iter()
+            if element.get("id")
+        }
+        if not ids:
+            return
+
+        def replace_url(match: re.Match) -> str:
+            target = ids.get(match.group(2))
+            if target is None:
+                return match.group(0)
+            return f"url({match.group(1)}#{target}{match.group(1)})"
+
+        for element in root.iter():
+            for name, value in element.attrib.items():
+                if name == "id":
+                    element.set(name, ids.get(value, value))
+                elif name in ("href", XLINK_HREF) and value.startswith("#"):
+                    element.set(name, f"#{ids.get(value[1:], value[1:])}")
+                elif "url(" in value:
+                    element.set(name, _URL_REF.sub(replace_url, value))
+            if element.tag == "style" and element.text:
+                element.text = _URL_REF.sub(replace_url, element.text)
+
+    @staticmethod
+    def build_sprite(icons: Dict[str, str]) -> str:
+        """
+        Build a sprite document with one <symbol> per icon.
+
+        Args:
+            icons: Mapping of icon id to SVG code
+
+        Returns:
+            SVG sprite; each icon is referenced as <use href="#icon-<id>"/>
+        """
+        sprite = ET.Element("svg", {"xmlns": SVG_NS})
+
+        for icon_id, svg_code in icons.items():
+            root = SVGSpriteBuilder.parse_icon(svg_code)
+            if root is None:
+                logger.warning(f"Skipping unparseable icon {icon_id}")
+                continue
+
+            SVGSpriteBuilder._scope_ids(root, f"icon-{icon_id}")
+
+            attributes = {
+                name: value
+                for name, value in root.attrib.items()
+                if name not in _DROPPED_ATTRIBUTES
+            }
+            attributes["id"] = f"icon-{icon_id}"
+            attributes["viewBox"] = SVGSpriteBuilder._view_box(root)
+
+            symbol = ET.SubElement(sprite, "symbol", attributes)
+            symbol.extend(list(root))
+
+        return ET.tostring(sprite, encoding="unicode")
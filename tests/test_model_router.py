@@ -0,0 +1,190 @@
+"""Tests for provider="auto" routing."""
+
+import asyncio
+import time
+from collections import Counter
+import pytest
+from app.core.config import settings
+from app.services import model_router
+from app.services.model_router import ModelRouter, ModelStats
+from app.services.svg_generator import SVGGenerator
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg"><path d="M0 0h1"/></svg>'
+
+
+@pytest.fixture(autouse=True)
+def server_keys(monkeypatch):
+    monkeypatch.setattr(settings, "router_openai_api_key", "openai-key")
+    monkeypatch.setattr(settings, "router_anthropic_api_key", "anthropic-key")
+    monkeypatch.setattr(settings, "gemini_api_key", "gemini-key")
+    monkeypatch.setattr(settings, "router_token_prices", {})
+
+
+def _router(**kwargs) -> ModelRouter:
+    options = {
+        "candidates": ["openai/fast", "anthropic/mid", "gemini/slow"],
+        "objective": "latency",
+        "exploration": 0.0,
+        "alpha": 0.5,
+        "min_samples": 2,
+    }
+    options.update(kwargs)
+    return ModelRouter(**options)
+
+
+def _warm(router: ModelRouter, latencies: dict) -> None:
+    for candidate, latency in latencies.items():
+        provider, _, model = candidate.partition("/")
+        for _ in range(router.min_samples):
+            router.record(provider, model, latency, valid=True)
+
+
+def test_cold_start_spreads_concurrent_choices():
+    router = _router()
+
+    choices = Counter(router.choose() for _ in range(6))
+
+    assert choices == {c: 2 for c in router.candidates}
+    assert all(d["reason"] == "cold_start" for d in router.decisions)
+
+
+def test_release_frees_in_flight_reservation():
+    router = _router()
+
+    first = router.choose()
+    router.release(*first)
+    router.release(*first)
+
+    assert router.in_flight[first] == 0
+    assert router.choose() == first
+
+
+def test_cold_start_prefers_fewest_samples():
+    router = _router()
+    router.record("openai", "fast", 1.0, valid=True)
+    router.record("anthropic", "mid", 1.0, valid=True)
+
+    assert router.choose() == ("gemini", "slow")
+
+
+def test_latency_objective_picks_lowest_p95():
+    router = _router()
+    _warm(router, {"openai/fast": 1.0, "anthropic/mid": 2.0, "gemini/slow": 3.0})
+
+    assert router.choose() == ("openai", "fast")
+    assert router.decisions[-1]["reason"] == "latency"
+
+
+def test_cost_objective_picks_cheapest(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "router_token_prices",
+        {"openai/fast": 1.0, "anthropic/mid": 0.1, "gemini/slow": 0.5},
+    )
+    router = _router(objective="cost")
+    for provider, model in router.candidates:
+        for _ in range(router.min_samples):
+            router.record(
+                provider,
+                model,
+                1.0,
+                valid=True,
+                llm_response={"usage": {"total_tokens": 1000}},
+            )
+
+    assert router.choose() == ("anthropic", "mid")
+
+
+def test_exploration_picks_random_candidate(monkeypatch):
+    router = _router(exploration=0.5)
+    _warm(router, {"openai/fast": 1.0, "anthropic/mid": 2.0, "gemini/slow": 3.0})
+    monkeypatch.setattr(model_router.random, "random", lambda: 0.1)
+    monkeypatch.setattr(model_router.random, "choice", lambda c: c[-1])
+
+    assert router.choose() == ("gemini", "slow")
+    assert router.decisions[-1]["reason"] == "explore"
+
+
+def test_candidates_without_credentials_are_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "router_openai_api_key", "")
+    monkeypatch.setattr(settings, "router_anthropic_api_key", "")
+    router = _router()
+
+    assert router.available() == [("gemini", "slow")]
+    assert {router.choose() for _ in range(3)} == {("gemini", "slow")}
+
+    monkeypatch.setattr(settings, "gemini_api_key", "")
+    with pytest.raises(ValueError):
+        router.choose()
+
+
+def test_failures_do_not_affect_latency():
+    stats = ModelStats(alpha=0.5)
+    stats.record(2.0, error=False, valid=True)
+    stats.record(0.01, error=True)
+
+    assert stats.latency == 2.0
+    assert stats.latency_var == 0.0
+    assert stats.error_rate == 0.5
+    assert stats.samples == 2
+
+
+def test_timeouts_count_as_errors_with_latency():
+    stats = ModelStats(alpha=0.5)
+    stats.record(2.0, error=False, valid=True)
+    stats.record(6.0, error=False, timed_out=True)
+
+    assert stats.latency == 4.0
+    assert stats.p95_latency > stats.latency
+    assert stats.error_rate == 0.5
+
+
+def test_candidate_that_only_fails_fast_is_not_preferred():
+    router = _router(candidates=["openai/fast", "gemini/slow"], min_samples=1)
+    router.record("openai", "fast", 0.01, error=True)
+    router.record("gemini", "slow", 2.0, valid=True)
+
+    assert router.choose() == ("gemini", "slow")
+
+
+class _StubClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def generate(self, prompt, model=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return {"response": SVG, "model": model}
+
+
+async def _generate_until(generator: SVGGenerator, timeout: float) -> None:
+    """Mimic run_cancellable: cancel the generation once the deadline passes."""
+    deadline = time.monotonic() + timeout
+    task = asyncio.create_task(generator.generate_icon("x", "auto", deadline=deadline))
+    while not task.done() and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_deadline_cancelled_candidate_does_not_stay_cold():
+    generator = SVGGenerator()
+    generator.router = _router(candidates=["gemini/fast", "openai/hangs"])
+    clients = {"gemini": _StubClient(0.0), "openai": _StubClient(10.0)}
+    generator._get_client = lambda provider, api_key: (clients[provider], provider)
+
+    async def run():
+        for _ in range(6):
+            await _generate_until(generator, 0.05)
+
+    asyncio.run(run())
+
+    stats = generator.router.stats
+    assert stats[("openai", "hangs")].samples == generator.router.min_samples
+    assert stats[("openai", "hangs")].error_rate > 0
+    assert stats[("openai", "hangs")].latency == pytest.approx(0.05, abs=0.05)
+    assert stats[("gemini", "fast")].samples == 6 - generator.router.min_samples
+    assert [d["choice"] for d in generator.router.decisions][-2:] == [
+        "gemini/fast",
+        "gemini/fast",
+    ]
+    assert not any(generator.router.in_flight.values())
@@ -0,0 +1,231 @@
+"""Tests for the per-tenant admission scheduler."""
+
+import asyncio
+import math
+import pytest
+from app.api.routes import _too_many_requests
+from app.core.config import settings
+from app.services.scheduler import AdmissionRejected, AdmissionScheduler, TokenBucket
+
+
+def _scheduler(**kwargs) -> AdmissionScheduler:
+    options = {
+        "max_concurrency": 1,
+        "max_queue_depth": 100,
+        "tenant_queue_depth": 50,
+        "tenant_rate": 100.0,
+        "tenant_burst": 100,
+        "tenant_weights": {},
+    }
+    options.update(kwargs)
+    return AdmissionScheduler(**options)
+
+
+async def _hold(scheduler: AdmissionScheduler, tenant: str = "blocker"):
+    """Take a slot and return its context manager, to release later."""
+    slot = scheduler.slot(tenant)
+    await slot.__aenter__()
+    return slot
+
+
+async def _enqueue(scheduler: AdmissionScheduler, tenant: str, order: list):
+    """Queue a request that records when it gets a slot."""
+
+    async def run():
+        async with scheduler.slot(tenant):
+            order.append(tenant)
+
+    task = asyncio.create_task(run())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_token_bucket_retry_after_covers_missing_tokens():
+    bucket = TokenBucket(rate=2.0, capacity=5)
+    now = bucket.updated
+
+    assert bucket.try_acquire(now, 5) == 0.0
+    assert bucket.try_acquire(now, 3) == pytest.approx(1.5)
+    assert bucket.try_acquire(now + 1.5, 3) == 0.0
+
+
+def test_reserve_retry_after_covers_whole_batch():
+    scheduler = _scheduler(tenant_rate=2.0, tenant_burst=10)
+    scheduler.reserve("a", 8)
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        scheduler.reserve("a", 6)
+
+    # 2 tokens left, 4 more needed at 2 per second.
+    assert exc_info.value.retry_after == pytest.approx(2.0, abs=0.05)
+    assert scheduler.snapshot()["tenants"]["a"]["rate_limited"] == 1
+
+
+def test_reserve_rejects_batch_larger_than_burst():
+    scheduler = _scheduler(tenant_burst=10)
+
+    with pytest.raises(ValueError):
+        scheduler.reserve("a", 11)
+
+
+def test_rate_limited_slot_retry_after():
+    scheduler = _scheduler(tenant_rate=0.5, tenant_burst=1)
+
+    async def run():
+        async with scheduler.slot("a"):
+            pass
+        async with scheduler.slot("a"):
+            pass
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        asyncio.run(run())
+
+    assert exc_info.value.reason == "Tenant rate limit exceeded"
+    assert exc_info.value.retry_after == pytest.approx(2.0, abs=0.05)
+
+
+def test_queue_full_retry_after():
+    scheduler = _scheduler(max_queue_depth=1)
+
+    async def run():
+        blocker = await _hold(scheduler)
+        queued = await _enqueue(scheduler, "a", [])
+        try:
+            async with scheduler.slot("b"):
+                pass
+        finally:
+            await blocker.__aexit__(None, None, None)
+            await queued
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        asyncio.run(run())
+
+    assert exc_info.value.reason == "Queue is full"
+    # One queued request ahead on one slot, at the initial 5s service time.
+    assert exc_info.value.retry_after == pytest.approx(10.0)
+
+
+def test_too_many_requests_rounds_retry_after_up():
+    error = _too_many_requests(AdmissionRejected("Tenant rate limit exceeded", 1.2))
+
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == str(math.ceil(1.2))
+
+
+def test_tenants_interleave_under_backlog():
+    scheduler = _scheduler()
+    order = []
+
+    async def run():
+        blocker = await _hold(scheduler)
+        tasks = [await _enqueue(scheduler, "a", order) for _ in range(4)]
+        tasks += [await _enqueue(scheduler, "b", order) for _ in range(4)]
+        await blocker.__aexit__(None, None, None)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["a", "b"] * 4
+
+
+def test_tenant_weights_share_slots():
+    scheduler = _scheduler(tenant_weights={"a": 2.0})
+    order = []
+
+    async def run():
+        blocker = await _hold(scheduler)
+        tasks = [await _enqueue(scheduler, "a", order) for _ in range(4)]
+        tasks += [await _enqueue(scheduler, "b", order) for _ in range(2)]
+        await blocker.__aexit__(None, None, None)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["a", "a", "b", "a", "a", "b"]
+
+
+def test_interactive_lane_goes_first():
+    scheduler = _scheduler()
+    order = []
+
+    async def run():
+        async def batch():
+            async with scheduler.slot("a", "batch"):
+                order.append("batch")
+
+        blocker = await _hold(scheduler)
+        tasks = [asyncio.create_task(batch())]
+        await asyncio.sleep(0)
+        tasks.append(await _enqueue(scheduler, "b", order))
+        await blocker.__aexit__(None, None, None)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["b", "batch"]
+
+
+def test_cancelled_waiters_are_cleaned_up():
+    scheduler = _scheduler()
+    order = []
+
+    async def run():
+        blocker = await _hold(scheduler)
+        abandoned = [await _enqueue(scheduler, "a", order) for _ in range(10)]
+        for task in abandoned:
+            task.cancel()
+        await asyncio.gather(*abandoned, return_exceptions=True)
+
+        snapshot = scheduler.snapshot()
+        assert snapshot["queued"] == 0
+        assert snapshot["tenants"]["a"]["queued"] == 0
+        assert snapshot["tenants"]["a"]["cancelled_while_queued"] == 10
+
+        # The abandoned requests must not push the tenant behind others.
+        tasks = [await _enqueue(scheduler, "b", order) for _ in range(3)]
+        tasks += [await _enqueue(scheduler, "a", order) for _ in range(3)]
+        await blocker.__aexit__(None, None, None)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["b", "a"] * 3
+    assert scheduler.snapshot()["active"] == 0
+
+
+def test_waiter_cancelled_after_dispatch_returns_slot():
+    scheduler = _scheduler()
+
+    async def run():
+        blocker = await _hold(scheduler)
+        waiter = await _enqueue(scheduler, "a", [])
+
+        # Hand the slot over and cancel before the waiter gets to run.
+        await blocker.__aexit__(None, None, None)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert waiter.cancelled()
+        assert scheduler.snapshot()["active"] == 0
+
+        async with scheduler.slot("b"):
+            assert scheduler.snapshot()["active"] == 1
+
+    asyncio.run(run())
+
+
+def test_idle_tenants_are_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "scheduler_tenant_idle_sweep", 0.0)
+    scheduler = _scheduler(tenant_rate=0.001)
+
+    scheduler.reserve("idle", 1)
+    scheduler.reserve("recent", 1)
+    assert set(scheduler.snapshot()["tenants"]) == {"idle", "recent"}
+
+    # Neither bucket has refilled yet.
+    scheduler.reserve("other", 1)
+    assert set(scheduler.snapshot()["tenants"]) == {"idle", "recent", "other"}
+
+    scheduler._tenants["idle"].bucket.tokens = scheduler.tenant_burst
+    scheduler.reserve("new", 1)
+    assert set(scheduler.snapshot()["tenants"]) == {"recent", "other", "new"}